@@ -300,6 +300,18 @@ def arg_to_seconds_timestamp(arg: Optional[str]) -> Optional[int]:
     if arg is None:
         return None
 
+    if not arg.isdigit():
+        try:
+            # ISO 8601 dates are parsed directly, as dateparser is much slower and is only needed for relative dates
+            date = datetime.fromisoformat(arg.rstrip('Z'))
+        except ValueError:
+            pass
+        else:
+            if date.tzinfo:
+                # dateparser converts dates with a UTC offset to UTC, so the same is done here
+                date = date.astimezone(timezone.utc).replace(tzinfo=None)
+            return date_to_seconds_timestamp(date)
+
     return date_to_seconds_timestamp(arg_to_datetime(arg))
 
 
@@ -5,6 +5,7 @@ from hashlib import md5
 from urllib.parse import urljoin
 
 import demistomock as demisto
+from CommonServerPython import arg_to_datetime
 from NetskopeAPIv1 import Client
 
 BASE_URL = 'https://api.com'
@@ -314,3 +315,26 @@ def test_list_user_associated_host(requests_mock):
     assert result.outputs[0]['os'] == 'Windows'
     assert result.outputs[0]['hostname'] == 'TESTXSOAR'
     assert result.outputs[0]['agent_status'] == 'Enabled'
+
+
+def test_arg_to_seconds_timestamp():
+    """
+    Scenario: Convert a date argument to a timestamp in seconds.
+    Given:
+        - ISO 8601 dates, with and without a UTC offset, and a relative date.
+    When:
+        - arg_to_seconds_timestamp is called.
+    Then:
+        - Ensure ISO 8601 dates are converted the same as when parsed by dateparser.
+        - Ensure relative dates are still supported.
+    """
+
+    from NetskopeAPIv1 import arg_to_seconds_timestamp, date_to_seconds_timestamp
+
+    for date in ('2023-01-01T10:00:00Z', '2023-01-01T10:00:00', '2023-01-01', '2023-01-01T10:00:00+02:00'):
+        assert arg_to_seconds_timestamp(date) == date_to_seconds_timestamp(arg_to_datetime(date))
+
+    assert arg_to_seconds_timestamp('2023-01-01T10:00:00+02:00') == arg_to_seconds_timestamp('2023-01-01T08:00:00Z')
+
+    assert arg_to_seconds_timestamp('7 days') < int(time.time())
+    assert arg_to_seconds_timestamp(None) is None
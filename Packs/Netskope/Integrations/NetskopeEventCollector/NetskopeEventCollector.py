@@ -3,7 +3,16 @@ from CommonServerPython import *  # noqa # pylint: disable=unused-wildcard-impor
 from CommonServerUserPython import *  # noqa
 
 import urllib3
-from typing import Dict, Any, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from threading import Event
+from typing import Dict, Any, Iterator, Optional, Tuple
+
+try:
+    # orjson parses the (up to 10,000 events) data export pages considerably faster than the stdlib json
+    from orjson import loads as json_loads
+except ImportError:  # pragma: no cover
+    from json import loads as json_loads
 
 # Disable insecure warnings
 urllib3.disable_warnings()  # pylint: disable=no-member
@@ -13,9 +22,16 @@ urllib3.disable_warnings()  # pylint: disable=no-member
 ALL_SUPPORTED_EVENT_TYPES = ['application', 'alert', 'page', 'audit', 'network']
 MAX_EVENTS_PAGE_SIZE = 10000
 MAX_SKIP = 50000
+MAX_EVENTS_IN_HUMAN_READABLE = 50
 
 EXECUTION_TIMEOUT_SECONDS = 190  # 3:30 minutes
 
+# HTTP connection pool and retry constants
+MAX_RETRIES = 10  # connection and read errors
+MAX_STATUS_RETRIES = 3  # rate limited (429) and server error responses
+RETRY_BACKOFF_FACTOR = 5
+RETRY_STATUS_CODES = [429, 500, 502, 503, 504]
+
 # Netskope response constants
 WAIT_TIME = 'wait_time'  # Wait time between queries
 RATE_LIMIT_REMAINING = "ratelimit-remaining"  # Rate limit remaining
@@ -38,8 +54,31 @@ class Client(BaseClient):
     def __init__(self, base_url: str, token: str, validate_certificate: bool, proxy: bool):
         self.fetch_status: dict = {event_type: False for event_type in ALL_SUPPORTED_EVENT_TYPES}
 
-        headers = {'Netskope-Api-Token': token}
-        super().__init__(base_url, verify=validate_certificate, proxy=proxy, headers=headers)
+        super().__init__(base_url, verify=validate_certificate, proxy=proxy)
+        # The token is set once on the session instead of being passed along with every request
+        self._session.headers.update({'Netskope-Api-Token': token})
+        self._mount_connection_pool()
+
+    def _mount_connection_pool(self):
+        """
+        Mounts a single retrying adapter on the session, sized to hold a keep-alive connection for each event type that is
+        pulled concurrently. Mounting it once (instead of passing `retries` to every request) keeps the pooled connections
+        alive between the calls.
+        """
+        # Connection and read errors keep the retry budget of BaseClient._implement_retry. Rate limited and server error
+        # responses get a small budget of their own and the (unbounded) Retry-After header is not waited for, so a run of
+        # such responses costs at most 0 + 10 + 20 seconds of backoff, well within the execution timeout.
+        method_whitelist = 'allowed_methods' if hasattr(Retry.DEFAULT, 'allowed_methods') else 'method_whitelist'
+        retry = Retry(total=MAX_RETRIES, connect=MAX_RETRIES, read=MAX_RETRIES, status=MAX_STATUS_RETRIES,
+                      backoff_factor=RETRY_BACKOFF_FACTOR, status_forcelist=RETRY_STATUS_CODES,
+                      respect_retry_after_header=False, raise_on_redirect=False, raise_on_status=False,
+                      **{method_whitelist: frozenset(['GET'])})
+        adapter_kwargs = {'pool_connections': 1, 'pool_maxsize': len(ALL_SUPPORTED_EVENT_TYPES), 'max_retries': retry}
+
+        # the SSLAdapter is needed to overcome the security hardening of Python 3.10 when not verifying the certificate
+        https_adapter = HTTPAdapter(**adapter_kwargs) if self._verify else SSLAdapter(verify=False, **adapter_kwargs)
+        self._session.mount('https://', https_adapter)
+        self._session.mount('http://', HTTPAdapter(**adapter_kwargs))
 
     def perform_data_export(self, endpoint: str, _type: str, index_name: str, operation: str):
         url_suffix = f'events/dataexport/{endpoint}/{_type}'
@@ -47,9 +86,9 @@ class Client(BaseClient):
             'index': index_name,
             'operation': operation
         }
-        response = self._http_request(method='GET', url_suffix=url_suffix, params=params, resp_type='response', retries=10)
+        response = self._http_request(method='GET', url_suffix=url_suffix, params=params, resp_type='response')
         honor_rate_limiting(headers=response.headers, endpoint=url_suffix)
-        return response.json()
+        return json_loads(response.content)
 
 
 ''' HELPER FUNCTIONS '''
@@ -80,26 +119,27 @@ def honor_rate_limiting(headers, endpoint):
         logging.error("Value error when honoring the rate limiting wait time {} {}".format(headers, str(ve)))
 
 
-def populate_parsing_rule_fields(event: dict, event_type: str):
+@lru_cache(maxsize=MAX_EVENTS_PAGE_SIZE)
+def timestamp_to_event_time(timestamp: int) -> str:
     """
-    Handles the source_log_event and _time fields.
-    Sets the source_log_event to the given event type and _time to the time taken from the timestamp field
+    Converts an event timestamp (in seconds) to the _time date string.
+    Netskope timestamps have a seconds resolution, so many of the pulled events share the same timestamp and each distinct
+    timestamp is formatted only once.
 
     Args:
-        event (dict): the event to edit
-        event_type (str): the event type tp set in the source_log_event field
+        timestamp (int): the event timestamp in seconds.
+
+    Returns:
+        str: the UTC date string of the timestamp.
     """
-    event['source_log_event'] = event_type
-    try:
-        event['_time'] = timestamp_to_datestring(event['timestamp'] * 1000, is_utc=True)
-    except TypeError:
-        # modeling rule will default on ingestion time if _time is missing
-        pass
+    return timestamp_to_datestring(timestamp * 1000, is_utc=True)
 
 
 def prepare_events(events: list, event_type: str) -> list:
     """
     Iterates over a list of given events and add/modify special fields like event_id, _time and source_log_event.
+    The source_log_event is set to the given event type and _time to the time taken from the timestamp field.
+    All the fields are populated in a single pass, as this runs over every pulled event.
 
     Args:
         events (list): list of events to modify.
@@ -109,9 +149,13 @@ def prepare_events(events: list, event_type: str) -> list:
         list: the list of modified events
     """
     for event in events:
-        populate_parsing_rule_fields(event, event_type)
-        event_id = event.get('_id')
-        event['event_id'] = event_id
+        event['source_log_event'] = event_type
+        event['event_id'] = event.get('_id')
+        try:
+            event['_time'] = timestamp_to_event_time(event['timestamp'])
+        except TypeError:
+            # modeling rule will default on ingestion time if _time is missing
+            pass
 
     return events
 
@@ -160,7 +204,7 @@ def setup_last_run(last_run_dict: dict) -> dict:
     Returns:
         dict: the modified last run dictionary with the needed operation
     """
-    first_fetch = int(arg_to_datetime('now').timestamp())  # type: ignore[union-attr]
+    first_fetch = int(time.time())
     for event_type in ALL_SUPPORTED_EVENT_TYPES:
         if not last_run_dict.get(event_type, {}).get('operation'):
             last_run_dict[event_type] = {'operation': first_fetch}
@@ -171,7 +215,8 @@ def setup_last_run(last_run_dict: dict) -> dict:
 
 
 def handle_data_export_single_event_type(client: Client, event_type: str, operation: str, limit: int,
-                                         execution_start_time: datetime) -> tuple[list, bool]:
+                                         execution_start_time: datetime,
+                                         stop_pulling: Optional[Event] = None) -> tuple[list, bool]:
     """
     Pulls events per each given event type. Each event type receives a dedicated index name that is constructed using the event
     type and the integration instance name. The function keeps pulling events as long as the limit was not exceeded.
@@ -179,6 +224,8 @@ def handle_data_export_single_event_type(client: Client, event_type: str, operat
     - Then it checks if we need to wait some time before making another call to the same endpoint by checking the wait_time value
         received in the previous response.
     - The operation variable marks the next operation to perform on this endpoint (besides the first fetch it is always 'next')
+    - Each received page is prepared (see prepare_events) as soon as it is parsed.
+    - If the stop_pulling event is set (the run failed elsewhere), no further page is requested.
     - After it is done pulling, it marks this event type as successfully done in the 'fetch_status' dictionary.
 
     Args:
@@ -187,9 +234,10 @@ def handle_data_export_single_event_type(client: Client, event_type: str, operat
         operation (str): The operation to perform. Can be 'next' or a timestamp string.
         limit (int): The limit which after we stop pulling.
         execution_start_time (datetime): The time when we started running the fetch mechanism.
+        stop_pulling (Event): When set, stop pulling before requesting the next page.
 
     Return:
-        list: The list of events pulled for the given event type.
+        list: The list of prepared events pulled for the given event type.
         bool: Was execution timeout reached.
     """
     wait_time: int = 0
@@ -212,6 +260,11 @@ def handle_data_export_single_event_type(client: Client, event_type: str, operat
             demisto.debug('No wait time received, going to sleep for 1 second')
             time.sleep(1)
 
+        # Every page pulled advances the Netskope iterator, so nothing more is pulled once the run was stopped
+        if stop_pulling and stop_pulling.is_set():
+            demisto.debug(f'Stopped pulling {event_type} events')
+            return events, True
+
         response = client.perform_data_export('events', event_type, index_name, operation)
 
         results = response.get('result', [])
@@ -223,7 +276,8 @@ def handle_data_export_single_event_type(client: Client, event_type: str, operat
         wait_time = arg_to_number(response.get(WAIT_TIME, 5)) or 5
         demisto.debug(f'Wait time is {wait_time} seconds')
 
-        events.extend(results)
+        # The page is prepared right after it is parsed, while its events are still hot
+        events.extend(prepare_events(results, event_type))
 
         if not results or len(results) < MAX_EVENTS_PAGE_SIZE:
             break
@@ -234,10 +288,52 @@ def handle_data_export_single_event_type(client: Client, event_type: str, operat
     return events, False
 
 
+def iter_all_events(client: Client, last_run: dict, limit: int = MAX_EVENTS_PAGE_SIZE) -> Iterator[Tuple[str, list]]:
+    """
+    Iterates over all supported event types and call the handle data export logic. Each event type is pulled from its own
+    dedicated endpoint, so all the event types are pulled concurrently and each one is yielded as soon as it is done, which
+    allows the caller to handle it without holding the events of all the other event types in memory. Once each event type is
+    done the operation for next run is set to 'next'.
+
+    Args:
+        client (Client): The Netskope client.
+        last_run (dict): The execution last run dict where the relevant operations are stored, updated in place.
+        limit (int): The limit which after we stop pulling.
+
+    Yields:
+        str: The event type.
+        list: The prepared events pulled for this event type.
+    """
+    execution_start_time = datetime.utcnow()
+    stop_pulling = Event()
+    with ThreadPoolExecutor(max_workers=len(ALL_SUPPORTED_EVENT_TYPES)) as executor:
+        futures = {
+            executor.submit(handle_data_export_single_event_type, client=client, event_type=event_type,
+                            operation=last_run.get(event_type, {}).get('operation'), limit=limit,
+                            execution_start_time=execution_start_time, stop_pulling=stop_pulling): event_type
+            for event_type in ALL_SUPPORTED_EVENT_TYPES
+        }
+
+        try:
+            for future in as_completed(futures):
+                event_type = futures[future]
+                events, time_out = future.result()
+                last_run[event_type] = {'operation': 'next'}
+
+                if time_out:
+                    demisto.info(f'Timeout reached, stopped pulling {event_type} events')
+
+                yield event_type, events
+        finally:
+            # If an event type failed or the caller stopped iterating, the other event types stop pulling new pages
+            stop_pulling.set()
+            for future in futures:
+                future.cancel()
+
+
 def get_all_events(client: Client, last_run: dict, limit: int = MAX_EVENTS_PAGE_SIZE) -> Tuple[list, dict]:
     """
-    Iterates over all supported event types and call the handle data export logic. Once each event type is done the operation for
-    next run is set to 'next'.
+    Pulls all supported event types and accumulates them into a single list.
 
     Args:
         client (Client): The Netskope client.
@@ -248,21 +344,12 @@ def get_all_events(client: Client, last_run: dict, limit: int = MAX_EVENTS_PAGE_
         list: The accumulated list of all events.
         dict: The updated last_run object.
     """
+    events_by_type = dict(iter_all_events(client, last_run, limit))
 
+    # The events are accumulated by the order of the event types to keep the output consistent between runs
     all_types_events_result = []
-    execution_start_time = datetime.utcnow()
     for event_type in ALL_SUPPORTED_EVENT_TYPES:
-        event_type_operation = last_run.get(event_type, {}).get('operation')
-
-        events, time_out = handle_data_export_single_event_type(client=client, event_type=event_type,
-                                                                operation=event_type_operation, limit=limit,
-                                                                execution_start_time=execution_start_time)
-        all_types_events_result.extend(prepare_events(events, event_type))
-        last_run[event_type] = {'operation': 'next'}
-
-        if time_out:
-            demisto.info('Timeout reached, stopped pulling events')
-            break
+        all_types_events_result.extend(events_by_type.get(event_type, []))
 
     return all_types_events_result, last_run
 
@@ -280,10 +367,15 @@ def get_events_command(client: Client, args: Dict[str, Any], last_run: dict) ->
     events, _ = get_all_events(client=client, last_run=last_run, limit=limit)
 
     for event in events:
-        event['timestamp'] = timestamp_to_datestring(event['timestamp'] * 1000)
+        # The timestamp was already converted to a UTC date string when the _time field was populated
+        event['timestamp'] = event.get('_time', event['timestamp'])
 
-    readable_output = tableToMarkdown('Events List:', events,
+    # Only a preview of the events is rendered, the full list is returned in the outputs
+    preview = events[:MAX_EVENTS_IN_HUMAN_READABLE]
+    metadata = f'Showing the first {len(preview)} out of {len(events)} events.' if len(events) > len(preview) else None
+    readable_output = tableToMarkdown('Events List:', preview,
                                       removeNull=True,
+                                      metadata=metadata,
                                       headers=['_id', 'timestamp', 'type', 'access_method', 'app', 'traffic_type'],
                                       headerTransform=string_to_table_header)
 
@@ -296,6 +388,49 @@ def get_events_command(client: Client, args: Dict[str, Any], last_run: dict) ->
     return results, events
 
 
+def fetch_events_command(client: Client, last_run: dict, max_fetch: int, vendor: str, product: str) -> int:
+    """
+    Pulls the events of all the event types and sends each event type to XSIAM as soon as it is pulled, so the events of all
+    the types are never held together. The last run is set even if an error occurs: an event type moves on to 'next' only if all
+    its events were pulled and sent, any other event type is set to 'resend'.
+
+    Args:
+        client (Client): The Netskope client.
+        last_run (dict): The execution last run dict where the relevant operations are stored.
+        max_fetch (int): The limit which after we stop pulling each event type.
+        vendor (str): The vendor to send the events with.
+        product (str): The product to send the events with.
+
+    Returns:
+        int: The number of events sent.
+    """
+    start = datetime.utcnow()
+    total_events = 0
+    sent_event_types: set = set()
+    events_iterator = iter_all_events(client, last_run, max_fetch)
+    try:
+        demisto.debug(f'Sending request with last run {last_run}')
+        for event_type, events in events_iterator:
+            demisto.debug(f'sending {len(events)} {event_type} events to xsiam')
+            send_events_to_xsiam(events=events, vendor=vendor, product=product)
+            sent_event_types.add(event_type)
+            total_events += len(events)
+    finally:
+        # Stops the pulling of the remaining event types in case of an error, their events are not sent
+        events_iterator.close()
+
+        for event_type in ALL_SUPPORTED_EVENT_TYPES:
+            if event_type not in sent_event_types or not client.fetch_status[event_type]:
+                last_run[event_type] = {'operation': 'resend'}
+        demisto.debug(f'Setting the last_run to: {last_run}')
+
+        end = datetime.utcnow()
+        demisto.debug(f'Handled {total_events} total events in {(end - start).seconds} seconds')
+        demisto.setLastRun(last_run)
+
+    return total_events
+
+
 ''' MAIN FUNCTION '''
 
 
@@ -313,12 +448,12 @@ def main() -> None:  # pragma: no cover
         command_name = demisto.command()
         demisto.debug(f'Command being called is {command_name}')
 
+        # The event types are pulled in worker threads, which also log to the server
+        support_multithreading()
         client = Client(base_url, token, verify_certificate, proxy)
         last_run = setup_last_run(demisto.getLastRun())
         demisto.debug(f'Running with the following last_run - {last_run}')
 
-        events: list[dict] = []
-        new_last_run: dict = {}
         if command_name == 'test-module':
             # This is the call made when pressing the integration Test button.
             result = test_module(client, last_run, max_fetch=MAX_EVENTS_PAGE_SIZE)  # type: ignore[arg-type]
@@ -331,23 +466,7 @@ def main() -> None:  # pragma: no cover
             return_results(results)
 
         elif command_name == 'fetch-events':
-            # We have this try-finally block for fetch events where wrapping up should be done if errors occur
-            start = datetime.utcnow()
-            try:
-                demisto.debug(f'Sending request with last run {last_run}')
-                events, new_last_run = get_all_events(client, last_run, max_fetch)
-            finally:
-                demisto.debug(f'sending {len(events)} to xsiam')
-                send_events_to_xsiam(events=events, vendor=vendor, product=product)
-
-                for event_type, status, in client.fetch_status.items():
-                    if not status:
-                        new_last_run[event_type] = {'operation': 'resend'}
-                demisto.debug(f'Setting the last_run to: {new_last_run}')
-
-                end = datetime.utcnow()
-                demisto.debug(f'Handled {len(events)} total events in {(end - start).seconds} seconds')
-                demisto.setLastRun(new_last_run)
+            fetch_events_command(client, last_run, max_fetch, vendor, product)
 
     # Log exceptions and return errors
     except Exception as e:
@@ -1,10 +1,14 @@
+import copy
 import io
 import json
 import re
+import threading
 import time
 
 import dateparser
+import demistomock as demisto
 import pytest
+from CommonServerPython import DemistoException, timestamp_to_datestring
 
 from NetskopeEventCollector import Client, ALL_SUPPORTED_EVENT_TYPES, RATE_LIMIT_REMAINING, RATE_LIMIT_RESET
 
@@ -38,6 +42,32 @@ def test_test_module(mocker):
     assert results == 'ok'
 
 
+@pytest.mark.parametrize('validate_certificate, expected_https_adapter', [(True, 'HTTPAdapter'), (False, 'SSLAdapter')])
+def test_client_connection_pool(validate_certificate, expected_https_adapter):
+    """
+    Given:
+        - Case a: a client which validates the certificate
+        - Case b: a client which does not validate the certificate
+    When:
+        - Creating the client
+    Then:
+        - Make sure a single retrying adapter is mounted, an SSLAdapter when the certificate is not validated
+        - Make sure connection and read errors keep the baseline retry budget, while status retries have a small budget.
+    """
+    from NetskopeEventCollector import MAX_RETRIES, MAX_STATUS_RETRIES, RETRY_BACKOFF_FACTOR, RETRY_STATUS_CODES
+    client = Client(BASE_URL, 'dummy_token', validate_certificate, False)
+    adapter = client._session.get_adapter(BASE_URL)
+    assert type(adapter).__name__ == expected_https_adapter
+    assert adapter._pool_maxsize == len(ALL_SUPPORTED_EVENT_TYPES)
+
+    retry = adapter.max_retries
+    assert retry.total == retry.connect == retry.read == MAX_RETRIES
+    assert retry.status == MAX_STATUS_RETRIES
+    assert retry.backoff_factor == RETRY_BACKOFF_FACTOR
+    assert list(retry.status_forcelist) == RETRY_STATUS_CODES
+    assert not retry.respect_retry_after_header
+
+
 def test_populate_prepare_events():
     """
     Given:
@@ -55,6 +85,23 @@ def test_populate_prepare_events():
     assert event.get('event_id') == 'f0e9b2cadd17402b59b3938b'
 
 
+def test_prepare_events_timestamps():
+    """
+    Given:
+        - Events sharing the same timestamp and an event without a timestamp
+    When:
+        - Running prepare_events
+    Then:
+        - Make sure events with the same timestamp get the same _time.
+        - Make sure the _time is not set for an event without a timestamp.
+    """
+    from NetskopeEventCollector import prepare_events
+    events = prepare_events([{'_id': '1', 'timestamp': 1684751416}, {'_id': '2', 'timestamp': 1684751416},
+                             {'_id': '3', 'timestamp': None}], event_type='network')
+    assert events[0]['_time'] == events[1]['_time'] == '2023-05-22T10:30:16.000Z'
+    assert '_time' not in events[2]
+
+
 def test_get_all_events(requests_mock):
     """
     Given:
@@ -82,6 +129,139 @@ def test_get_all_events(requests_mock):
     assert all([new_last_run[event_type]['operation'] == 'next' for event_type in ALL_SUPPORTED_EVENT_TYPES])
 
 
+def test_iter_all_events(requests_mock):
+    """
+    Given:
+        - fetch-events call
+    When:
+        - Iterating over the events of all the event types
+    Then:
+        - Make sure each event type is yielded once with its own prepared events
+        - Make sure the last_run is updated in place.
+    """
+
+    def json_callback(request, _):
+        endpoint = request.path.split('/')[-1]
+        return EVENTS_PAGE_RAW[endpoint]
+
+    from NetskopeEventCollector import iter_all_events
+    client = Client(BASE_URL, 'netskope_token', validate_certificate=False, proxy=False)
+    url_matcher = re.compile('https://netskope[.]example[.]com/events/dataexport/events')
+    requests_mock.get(url_matcher, json=json_callback)
+    last_run = {event_type: dict(operation) for event_type, operation in FIRST_LAST_RUN.items()}
+    events_by_type = dict(iter_all_events(client, last_run))
+    assert sorted(events_by_type) == sorted(ALL_SUPPORTED_EVENT_TYPES)
+    for event_type, events in events_by_type.items():
+        assert all(event.get('source_log_event') == event_type for event in events)
+    assert all(last_run[event_type]['operation'] == 'next' for event_type in ALL_SUPPORTED_EVENT_TYPES)
+
+
+def test_fetch_events_command_timeout(mocker):
+    """
+    Given:
+        - fetch-events call where the execution timeout is reached while pulling the page events
+    When:
+        - Running the fetch_events_command
+    Then:
+        - Make sure the events pulled so far for all the event types are sent.
+        - Make sure the page event type is not marked as fetched and is set to 'resend'.
+        - Make sure the other event types are set to 'next'.
+    """
+    from NetskopeEventCollector import fetch_events_command, MAX_EVENTS_PAGE_SIZE
+    page_thread_ids = set()
+
+    def perform_data_export(endpoint, _type, index_name, operation):
+        if _type == 'page':
+            # A full page, so the page event type keeps pulling and checks the execution time again
+            page_thread_ids.add(threading.get_ident())
+            return {'result': [{'_id': str(i), 'timestamp': 1684751416} for i in range(MAX_EVENTS_PAGE_SIZE)], 'wait_time': 0}
+        return {'result': [{'_id': _type, 'timestamp': 1684751416}], 'wait_time': 0}
+
+    client = Client(BASE_URL, 'dummy_token', False, False)
+    mocker.patch.object(client, 'perform_data_export', side_effect=perform_data_export)
+    mocker.patch('NetskopeEventCollector.is_execution_time_exceeded',
+                 side_effect=lambda start_time: threading.get_ident() in page_thread_ids)
+    mocker.patch.object(time, 'sleep')
+    send_events_mock = mocker.patch('NetskopeEventCollector.send_events_to_xsiam')
+    mocker.patch.object(demisto, 'setLastRun')
+    last_run = {event_type: dict(operation) for event_type, operation in FIRST_LAST_RUN.items()}
+
+    total_events = fetch_events_command(client, last_run, 2 * MAX_EVENTS_PAGE_SIZE, 'netskope', 'netskope')
+
+    assert send_events_mock.call_count == len(ALL_SUPPORTED_EVENT_TYPES)
+    assert total_events == MAX_EVENTS_PAGE_SIZE + len(ALL_SUPPORTED_EVENT_TYPES) - 1
+    assert not client.fetch_status['page']
+    assert last_run['page']['operation'] == 'resend'
+    for event_type in ALL_SUPPORTED_EVENT_TYPES:
+        if event_type != 'page':
+            assert client.fetch_status[event_type]
+            assert last_run[event_type]['operation'] == 'next'
+
+
+def test_fetch_events_command_event_type_error(mocker):
+    """
+    Given:
+        - fetch-events call where pulling the alert events fails, while the other event types are still being pulled
+    When:
+        - Running the fetch_events_command
+    Then:
+        - Make sure the error is raised and nothing is sent.
+        - Make sure all the event types are set to 'resend', including the ones that were fully pulled but not sent.
+    """
+    from NetskopeEventCollector import fetch_events_command
+    alert_failed = threading.Event()
+
+    def perform_data_export(endpoint, _type, index_name, operation):
+        if _type == 'alert':
+            alert_failed.set()
+            raise DemistoException('Error in API call [500]')
+        # The other event types are only done after the alert event type failed
+        alert_failed.wait(5)
+        threading.Event().wait(0.5)
+        return {'result': [{'_id': _type, 'timestamp': 1684751416}], 'wait_time': 0}
+
+    client = Client(BASE_URL, 'dummy_token', False, False)
+    mocker.patch.object(client, 'perform_data_export', side_effect=perform_data_export)
+    mocker.patch.object(time, 'sleep')
+    send_events_mock = mocker.patch('NetskopeEventCollector.send_events_to_xsiam')
+    set_last_run_mock = mocker.patch.object(demisto, 'setLastRun')
+    last_run = {event_type: dict(operation) for event_type, operation in FIRST_LAST_RUN.items()}
+
+    with pytest.raises(DemistoException):
+        fetch_events_command(client, last_run, 1, 'netskope', 'netskope')
+
+    send_events_mock.assert_not_called()
+    assert all(client.fetch_status[event_type] for event_type in ALL_SUPPORTED_EVENT_TYPES if event_type != 'alert')
+    assert all(last_run[event_type]['operation'] == 'resend' for event_type in ALL_SUPPORTED_EVENT_TYPES)
+    set_last_run_mock.assert_called_once_with(last_run)
+
+
+def test_fetch_events_command_send_error(mocker):
+    """
+    Given:
+        - fetch-events call where sending the events to XSIAM fails
+    When:
+        - Running the fetch_events_command
+    Then:
+        - Make sure the error is raised after trying to send a single event type.
+        - Make sure all the event types are set to 'resend', as none of them was sent.
+    """
+    from NetskopeEventCollector import fetch_events_command
+    client = Client(BASE_URL, 'dummy_token', False, False)
+    mocker.patch.object(client, 'perform_data_export', return_value={'result': [], 'wait_time': 0})
+    mocker.patch.object(time, 'sleep')
+    send_events_mock = mocker.patch('NetskopeEventCollector.send_events_to_xsiam',
+                                    side_effect=DemistoException('Error sending new events into XSIAM.'))
+    mocker.patch.object(demisto, 'setLastRun')
+    last_run = {event_type: dict(operation) for event_type, operation in FIRST_LAST_RUN.items()}
+
+    with pytest.raises(DemistoException):
+        fetch_events_command(client, last_run, 1, 'netskope', 'netskope')
+
+    assert send_events_mock.call_count == 1
+    assert all(last_run[event_type]['operation'] == 'resend' for event_type in ALL_SUPPORTED_EVENT_TYPES)
+
+
 def test_get_events_command(mocker):
     """
     Given:
@@ -91,17 +271,38 @@ def test_get_events_command(mocker):
     Then:
         - Make sure the number of events returns as expected
         - Make sure that human_readable returned as expected
-        - Make sure the outputs are set correctly.
+        - Make sure the outputs are set correctly, with the timestamps converted to UTC date strings.
     """
-    from NetskopeEventCollector import get_events_command
+    from NetskopeEventCollector import get_events_command, prepare_events
     client = Client(BASE_URL, 'dummy_token', False, False)
-    mocker.patch('NetskopeEventCollector.get_all_events', return_value=[MOCK_ENTRY, {}])
+    mocker.patch('NetskopeEventCollector.get_all_events', return_value=[prepare_events(copy.deepcopy(MOCK_ENTRY), 'page'), {}])
     mocker.patch.object(time, "sleep")
     results, events = get_events_command(client, args={}, last_run=FIRST_LAST_RUN)
     assert 'Events List' in results.readable_output
     assert len(events) == 9
     assert results.outputs_prefix == 'Netskope.Event'
-    assert results.outputs == MOCK_ENTRY
+    assert results.outputs == events
+    assert [event['timestamp'] for event in events] == [timestamp_to_datestring(event['timestamp'] * 1000, is_utc=True)
+                                                        for event in MOCK_ENTRY]
+
+
+def test_get_events_command_human_readable_preview(mocker):
+    """
+    Given:
+        - netskope-get-events call which returns more events than the human readable preview size
+    When:
+        - Running the get_events_command
+    Then:
+        - Make sure only the preview is rendered in the human readable, while all the events are returned in the outputs.
+    """
+    from NetskopeEventCollector import get_events_command, MAX_EVENTS_IN_HUMAN_READABLE
+    client = Client(BASE_URL, 'dummy_token', False, False)
+    events = [{'_id': str(i), 'timestamp': 1684751416} for i in range(MAX_EVENTS_IN_HUMAN_READABLE + 1)]
+    mocker.patch('NetskopeEventCollector.get_all_events', return_value=[events, {}])
+    results, _ = get_events_command(client, args={}, last_run=FIRST_LAST_RUN)
+    assert f'Showing the first {MAX_EVENTS_IN_HUMAN_READABLE} out of {len(events)} events.' in results.readable_output
+    assert f'| {MAX_EVENTS_IN_HUMAN_READABLE} |' not in results.readable_output
+    assert len(results.outputs) == MAX_EVENTS_IN_HUMAN_READABLE + 1
 
 
 @pytest.mark.parametrize('headers, endpoint, expected_sleep', [
@@ -159,7 +360,6 @@ def test_setup_last_run(mocker, last_run_dict, expected_operation_value):
 
     """
     from NetskopeEventCollector import setup_last_run
-    first_fetch = dateparser.parse('2023-01-01T10:00:00Z')
-    mocker.patch.object(dateparser, "parse", return_value=first_fetch)
+    mocker.patch.object(time, "time", return_value=dateparser.parse('2023-01-01T10:00:00Z').timestamp())
     last_run = setup_last_run(last_run_dict)
     assert all([val.get('operation') == expected_operation_value for key, val in last_run.items()])